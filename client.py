@@ -1,24 +1,43 @@
 import asyncio
 import sys
 import os
-import json
-from typing import Optional
+from typing import Callable, Optional
 from contextlib import AsyncExitStack
-import aiohttp
+from types import MappingProxyType
+import aioconsole
+import httpx
+import orjson
 
-from mcp import ClientSession, StdioServerParameters
+from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
 from dotenv import load_dotenv
 
+import event_loop
+
 load_dotenv()  # Load environment variables from .env
 
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Built once and frozen; httpx copies it into each request's headers
+GROQ_HEADERS = MappingProxyType({
+    "Content-Type": "application/json",
+    "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"
+})
+
+# Output templates for the per-tool-call paths
+TOOL_OK = "🔧 Tool {} result:\n{}".format
+TOOL_ERR = "⚠️ Tool error: {}".format
+TOOL_FAILED = "❌ Tool execution failed: {}".format
+FINAL_ANALYSIS = "📝 Final analysis:\n"
+
 class MCPClient:
     def __init__(self):
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
-        self.http_session: Optional[aiohttp.ClientSession] = None
+        self.http_session: Optional[httpx.AsyncClient] = None
         self.stdio = None
         self.write = None
+        self._tools_response: Optional[types.ListToolsResult] = None
+        self._groq_tools: Optional[list] = None
 
     async def connect_to_server(self, server_script_path: str):
         """Connect to an MCP server"""
@@ -36,137 +55,213 @@ class MCPClient:
 
         stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
         self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
-        self.http_session = await self.exit_stack.enter_async_context(aiohttp.ClientSession())
+        self.session = await self.exit_stack.enter_async_context(
+            ClientSession(self.stdio, self.write, message_handler=self._handle_message)
+        )
+
+        # HTTP/2 multiplexes the Groq calls over one keep-alive TLS connection
+        self.http_session = await self.exit_stack.enter_async_context(
+            httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=75
+                ),
+                timeout=60
+            )
+        )
 
         await self.session.initialize()
 
-        response = await self.session.list_tools()
-        tools = response.tools
-        print("\nConnected to server with tools:", [tool.name for tool in tools])
+        await self._refresh_tools()
+        print("\nConnected to server with tools:", [tool.name for tool in self._tools_response.tools])
+
+    async def _handle_message(self, message) -> None:
+        """Invalidate the cached tool list when the server reports it changed"""
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            # Refetched lazily by the next query; awaiting list_tools() here would
+            # block the session's receive loop
+            self._groq_tools = None
+
+    async def _refresh_tools(self):
+        """Fetch the server's tools and cache them in Groq function-calling format"""
+        self._tools_response = await self.session.list_tools()
+        self._groq_tools = [
+            {
+                "type": "function",
+                "function": {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": tool.inputSchema
+                }
+            }
+            for tool in self._tools_response.tools
+        ]
+
+    async def _groq_request(self, payload: dict, on_delta: Callable[[str], None]) -> dict:
+        """POST a streaming chat completion request and return the assembled assistant message
+
+        Content deltas are also passed to on_delta as they arrive.
+        """
+        body = orjson.dumps({**payload, "stream": True})
+        async with self.http_session.stream("POST", GROQ_URL, headers=GROQ_HEADERS, content=body) as resp:
+            if resp.status_code != 200:
+                buf = await resp.aread()
+                # Gateways may answer errors with non-JSON bodies
+                try:
+                    error = orjson.loads(buf).get('error', 'Unknown error')
+                except (orjson.JSONDecodeError, AttributeError):
+                    error = buf.decode(errors="replace") or 'Unknown error'
+                raise Exception(f"Groq API error: {error}")
+
+            content = []
+            tool_calls = {}
+            done = False
+            # Server-sent events: one "data: {...}" frame per line, ending with "data: [DONE]"
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                frame = line[5:].strip()
+                if frame == "[DONE]":
+                    done = True
+                    break
+                chunk = orjson.loads(frame)
+                if "error" in chunk:
+                    raise Exception(f"Groq API error: {chunk['error']}")
+                choices = chunk.get("choices")
+                if not choices:
+                    continue
+                delta = choices[0].get("delta", {})
+                if text := delta.get("content"):
+                    content.append(text)
+                    on_delta(text)
+                # Tool calls arrive as fragments keyed by index; arguments are concatenated
+                for tc in delta.get("tool_calls") or []:
+                    call = tool_calls.setdefault(
+                        tc["index"], {"type": "function", "function": {"name": "", "arguments": ""}}
+                    )
+                    if tc.get("id"):
+                        call["id"] = tc["id"]
+                    fn = tc.get("function") or {}
+                    call["function"]["name"] += fn.get("name") or ""
+                    call["function"]["arguments"] += fn.get("arguments") or ""
+
+            if not done:
+                raise Exception("Groq API error: stream ended before [DONE]")
+
+        message = {"role": "assistant", "content": "".join(content) or None}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+        return message
+
+    async def _run_tool_call(self, call: dict):
+        """Run one tool call, returning its display text and the tool message for follow-up"""
+        tool_name = call["function"]["name"]
+        args_raw = call["function"].get("arguments")
+        try:
+            # A streamed call with no argument fragments leaves arguments empty
+            tool_args = orjson.loads(args_raw) if args_raw else {}
+        except Exception:
+            tool_args = args_raw
 
-    async def process_query(self, query: str) -> str:
-        """Process a query using Groq API and available tools"""
+        # ClientSession matches responses by JSON-RPC id, so calls can be in flight together
+        result = await self.session.call_tool(tool_name, tool_args)
+
+        # Extract raw text from the TextContent items of the CallToolResult
+        raw_content = "".join(rc.text for rc in result.content if isinstance(rc, types.TextContent))
+
+        # If the tool itself signaled an error
+        if result.isError:
+            return TOOL_ERR(raw_content), self._tool_message(call, raw_content)
+
+        # Pretty-print JSON for display only; the model gets the compact original
+        try:
+            formatted = orjson.dumps(orjson.loads(raw_content), option=orjson.OPT_INDENT_2).decode()
+        except orjson.JSONDecodeError:
+            formatted = raw_content
+
+        return TOOL_OK(tool_name, formatted), self._tool_message(call, raw_content)
+
+    @staticmethod
+    def _tool_message(call: dict, content: str) -> dict:
+        """Tool result for the follow-up request, including tool_call_id"""
+        return {
+            "role": "tool",
+            "tool_call_id": call.get("id"),
+            "name": call["function"]["name"],
+            "content": content
+        }
+
+    async def process_query(self, query: str, on_delta: Callable[[str], None]) -> None:
+        """Process a query using Groq API and available tools
+
+        The response text is passed to on_delta piece by piece as it is produced.
+        """
         messages = [{"role": "user", "content": query}]
-        final_text = []
 
         try:
-            # List available tools
-            response = await self.session.list_tools()
-            available_tools = [
-                {"name": tool.name, "description": tool.description, "input_schema": tool.inputSchema}
-                for tool in response.tools
-            ]
-
-            # Convert tools to Groq format
-            groq_tools = []
-            for tool in available_tools:
-                try:
-                    groq_tools.append({
-                        "type": "function",
-                        "function": {
-                            "name": tool["name"],
-                            "description": tool["description"],
-                            "parameters": tool["input_schema"]
-                        }
-                    })
-                except KeyError as e:
-                    print(f"Error converting tool {tool.get('name')}: {e}")
-
-            url = "https://api.groq.com/openai/v1/chat/completions"
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"
-            }
+            if self._groq_tools is None:
+                await self._refresh_tools()
+
             data = {
                 "model": "llama-3.3-70b-versatile",
                 "messages": messages,
-                "tools": groq_tools,
-                "tool_choice": "auto",
                 "max_tokens": 1000
             }
+            # Only advertise tools when the server has any
+            if self._groq_tools:
+                data["tools"] = self._groq_tools
+                data["tool_choice"] = "auto"
 
-            async with self.http_session.post(url, headers=headers, json=data) as resp:
-                if resp.status != 200:
-                    error = await resp.json()
-                    raise Exception(f"Groq API error: {error.get('error', 'Unknown error')}")
-                response_data = await resp.json()
-
-            msg = response_data["choices"][0]["message"]
-            if content := msg.get("content"):
-                final_text.append(content)
-            tool_calls = msg.get("tool_calls", [])
-
-            # Execute each tool call
-            for call in tool_calls:
-                tool_name = call["function"]["name"]
-                args_raw = call["function"].get("arguments")
-                try:
-                    tool_args = json.loads(args_raw)
-                except Exception:
-                    tool_args = args_raw
+            msg = await self._groq_request(data, on_delta)
+            tool_calls = msg.get("tool_calls")
 
-                try:
-                    result = await self.session.call_tool(tool_name, tool_args)
-
-                    # Extract raw text from TextContent wrapper if present
-                    rc = getattr(result, 'content', None)
-                    if hasattr(rc, 'text'):
-                        raw_content = rc.text
-                    else:
-                        raw_content = rc
-
-                    # If the tool itself signaled an error
-                    if getattr(result, 'error', False):
-                        final_text.append(f"⚠️ Tool error: {raw_content}")
-                        continue
-
-                    # Pretty-print JSON if possible
-                    try:
-                        parsed = json.loads(raw_content)
-                        formatted = json.dumps(parsed, indent=2)
-                    except Exception:
-                        formatted = str(raw_content)
-
-                    final_text.append(f"🔧 Tool {tool_name} result:\n{formatted}")
-
-                    # Append tool result for follow-up, including tool_call_id
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": call.get("id"),
-                        "name": tool_name,
-                        "content": formatted
-                    })
-
-                    # Follow-up analysis
-                    followup = {"model": "llama-3.3-70b-versatile", "messages": messages, "max_tokens": 1000}
-                    async with self.http_session.post(url, headers=headers, json=followup) as fu:
-                        if fu.status != 200:
-                            err = await fu.json()
-                            raise Exception(f"Groq API error: {err.get('error', 'Unknown error')}")
-                        fu_data = await fu.json()
-
-                    if fu_data.get("choices"):
-                        fa = fu_data["choices"][0]["message"].get("content")
-                        if fa:
-                            final_text.append(f"📝 Final analysis:\n{fa}")
-
-                except Exception as e:
-                    final_text.append(f"❌ Tool execution failed: {e}")
+            # Fast path: a plain answer has already been streamed and needs no follow-up
+            if not tool_calls:
+                return
 
-        except Exception as e:
-            final_text.append(f"🚨 Critical error processing query: {e}")
+            # Execute the tool calls concurrently; results are applied in call order
+            results = await asyncio.gather(
+                *[self._run_tool_call(call) for call in tool_calls],
+                return_exceptions=True
+            )
+
+            # The follow-up must see the assistant turn that requested the tools,
+            # followed by exactly one tool message per tool_call_id
+            messages.append(msg)
+            for call, result in zip(tool_calls, results):
+                if isinstance(result, Exception):
+                    on_delta("\n" + TOOL_FAILED(result))
+                    messages.append(self._tool_message(call, f"Tool execution failed: {result}"))
+                    continue
+                text, tool_message = result
+                on_delta("\n" + text)
+                messages.append(tool_message)
 
-        return "\n".join(final_text)
+            # Single follow-up analysis over all tool results
+            on_delta("\n" + FINAL_ANALYSIS)
+            followup = {"model": "llama-3.3-70b-versatile", "messages": messages, "max_tokens": 1000}
+            await self._groq_request(followup, on_delta)
+
+        except Exception as e:
+            on_delta(f"\n🚨 Critical error processing query: {e}")
 
     async def chat_loop(self):
         print("\nMCP Client Started! Type your queries or 'quit' to exit.")
         while True:
             try:
-                query = input("\nQuery: ").strip()
+                # Read stdin off the event loop so it keeps servicing MCP notifications
+                # and connection keep-alives while waiting for a line
+                query = (await aioconsole.ainput("\nQuery: ")).strip()
                 if query.lower() == 'quit':
                     break
-                print("\n" + await self.process_query(query))
+                # Print the response as it streams in
+                print()
+                await self.process_query(query, on_delta=lambda text: print(text, end="", flush=True))
+                print()
             except Exception as e:
                 print(f"Error: {e}")
 
@@ -185,4 +280,4 @@ async def main():
         await client.cleanup()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    event_loop.run(main())
\ No newline at end of file
@@ -0,0 +1,15 @@
+import asyncio
+import sys
+from typing import Any, Coroutine
+
+
+def run(main: Coroutine) -> Any:
+    """Run a coroutine on uvloop where available, otherwise on the default asyncio loop"""
+    if sys.platform != "win32":
+        try:
+            import uvloop
+        except ImportError:
+            pass
+        else:
+            return uvloop.run(main)
+    return asyncio.run(main)
@@ -1,5 +1,6 @@
 # main.py
+import event_loop
 import server
 
 if __name__ == "__main__":
-    server.mcp.run()
+    event_loop.run(server.mcp.run_stdio_async())
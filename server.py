@@ -1,37 +1,52 @@
 from mcp.server.fastmcp import FastMCP
-from pydantic import BaseModel
+from mcp.server.fastmcp.exceptions import ToolError
 import asyncio
-import json
+import orjson
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, FrozenSet
+
+import event_loop
 
 # Initialize MCP server
 mcp = FastMCP("Healthcare MCP Server")
 
-# Define response model
-class ToolResponse(BaseModel):
-    content: str
-    error: bool = False
-
 # Configure dataset paths
 DATASET_PATH = Path("dataset")
 PATIENTS: List[Dict] = []
 MEDICATIONS: Dict = {}
 GUIDELINES: List[Dict] = []
+INTERACTIONS: Dict[str, FrozenSet[str]] = {}
+
+# Pre-serialized tool payloads; the datasets are read-only after loading
+PATIENTS_LIST_JSON: str = orjson.dumps({"patients": []}).decode()
+PATIENT_JSON_BY_ID: Dict[str, str] = {}
+GUIDELINE_JSON_BY_CONDITION: Dict[str, str] = {}
 
 # Load mock data
 def load_mock_data():
-    global PATIENTS, MEDICATIONS, GUIDELINES
+    global PATIENTS, MEDICATIONS, GUIDELINES, INTERACTIONS
+    global PATIENTS_LIST_JSON, PATIENT_JSON_BY_ID, GUIDELINE_JSON_BY_CONDITION
     
     try:
-        with open(DATASET_PATH / "patients.json") as f:
-            PATIENTS = json.load(f)
+        with open(DATASET_PATH / "patients.json", "rb") as f:
+            PATIENTS = orjson.loads(f.read())
         
-        with open(DATASET_PATH / "medications.json") as f:
-            MEDICATIONS = json.load(f)
+        with open(DATASET_PATH / "medications.json", "rb") as f:
+            MEDICATIONS = orjson.loads(f.read())
             
-        with open(DATASET_PATH / "guidelines.json") as f:
-            GUIDELINES = json.load(f)
+        with open(DATASET_PATH / "guidelines.json", "rb") as f:
+            GUIDELINES = orjson.loads(f.read())
+
+        INTERACTIONS = {k: frozenset(v.get("interactions", [])) for k, v in MEDICATIONS.items()}
+
+        # Serialize once, indexed by lookup key so tools avoid a linear scan per call
+        PATIENTS_LIST_JSON = orjson.dumps(
+            {"patients": [{"id": p["id"], "name": p["name"]} for p in PATIENTS]}
+        ).decode()
+        PATIENT_JSON_BY_ID = {p["id"]: orjson.dumps(p).decode() for p in PATIENTS}
+        GUIDELINE_JSON_BY_CONDITION = {
+            g["condition"].lower(): orjson.dumps(g).decode() for g in GUIDELINES
+        }
             
     except Exception as e:
         print(f"Error loading mock data: {str(e)}")
@@ -39,83 +54,72 @@ def load_mock_data():
 # Initialize data
 load_mock_data()
 
-@mcp.tool()
-async def list_patients_tool() -> ToolResponse:
+# Tools return their JSON text as-is so FastMCP passes it through as TextContent
+# without wrapping it in another serialized envelope; failures raise ToolError,
+# which FastMCP reports as an isError result
+@mcp.tool(structured_output=False)
+async def list_patients_tool() -> str:
     """List all available patient IDs and names"""
-    try:
-        patient_list = [{"id": p["id"], "name": p["name"]} for p in PATIENTS]
-        return ToolResponse(content=json.dumps({"patients": patient_list}))
-    except Exception as e:
-        return ToolResponse(content=f"Error listing patients: {str(e)}", error=True)
+    return PATIENTS_LIST_JSON
 
-@mcp.tool()
-async def fetch_patient_data_tool(patient_id: str) -> ToolResponse:
+@mcp.tool(structured_output=False)
+async def fetch_patient_data_tool(patient_id: str) -> str:
     """
     Fetch patient EHR data
     
     Args:
         patient_id: Patient identifier (e.g. PT-1001)
     """
-    try:
-        if not patient_id:
-            return ToolResponse(content="Missing required patient_id", error=True)
+    if not patient_id:
+        raise ToolError("Missing required patient_id")
+    
+    patient_json = PATIENT_JSON_BY_ID.get(patient_id)
+    if not patient_json:
+        raise ToolError(f"Patient {patient_id} not found")
         
-        patient = next((p for p in PATIENTS if p["id"] == patient_id), None)
-        if not patient:
-            return ToolResponse(content=f"Patient {patient_id} not found", error=True)
-            
-        return ToolResponse(content=json.dumps(patient))
-    except Exception as e:
-        return ToolResponse(content=f"Error fetching patient data: {str(e)}", error=True)
+    return patient_json
 
-@mcp.tool()
-async def check_medication_interactions_tool(medications: List[str]) -> ToolResponse:
+@mcp.tool(structured_output=False)
+async def check_medication_interactions_tool(medications: List[str]) -> str:
     """
     Check medication interactions
     
     Args:
         medications: List of medication names (e.g. ["Aspirin", "Lisinopril"])
     """
-    try:
-        if not medications or not isinstance(medications, list):
-            return ToolResponse(content="Invalid medications list format", error=True)
-        
-        interactions = []
-        for med in medications:
-            if med in MEDICATIONS:
-                interacting_meds = [m for m in medications 
-                                   if m in MEDICATIONS[med].get("interactions", [])]
-                if interacting_meds:
-                    interactions.append(f"{med} interacts with: {', '.join(interacting_meds)}")
-        
-        result = interactions if interactions else ["No dangerous interactions found"]
-        return ToolResponse(content=json.dumps({"interactions": result}))
-    except Exception as e:
-        return ToolResponse(content=f"Error checking interactions: {str(e)}", error=True)
+    if not medications or not isinstance(medications, list):
+        raise ToolError("Invalid medications list format")
+    
+    query_set = set(medications)
+    interactions = []
+    for med in medications:
+        if med in INTERACTIONS:
+            hits = INTERACTIONS[med] & query_set
+            if hits:
+                # Keep the caller's ordering in the reported list
+                interacting_meds = [m for m in medications if m in hits]
+                interactions.append(f"{med} interacts with: {', '.join(interacting_meds)}")
+    
+    result = interactions if interactions else ["No dangerous interactions found"]
+    return orjson.dumps({"interactions": result}).decode()
 
-@mcp.tool()
-async def get_clinical_guidelines_tool(condition: str) -> ToolResponse:
+@mcp.tool(structured_output=False)
+async def get_clinical_guidelines_tool(condition: str) -> str:
     """
     Retrieve clinical guidelines
     
     Args:
         condition: Medical condition (e.g. hypertension)
     """
-    try:
-        if not condition:
-            return ToolResponse(content="Missing required condition", error=True)
+    if not condition:
+        raise ToolError("Missing required condition")
+    
+    guideline_json = GUIDELINE_JSON_BY_CONDITION.get(condition.lower())
+    if not guideline_json:
+        raise ToolError(f"No guidelines found for {condition}")
         
-        guideline = next(
-            (g for g in GUIDELINES 
-             if g["condition"].lower() == condition.lower()),
-            None
-        )
-        if not guideline:
-            return ToolResponse(content=f"No guidelines found for {condition}", error=True)
-            
-        return ToolResponse(content=json.dumps(guideline))
-    except Exception as e:
-        return ToolResponse(content=f"Error fetching guidelines: {str(e)}", error=True)
+    return guideline_json
 
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    # Same as mcp.run() for stdio, but on uvloop where available
+    event_loop.run(mcp.run_stdio_async())
\ No newline at end of file